@@ -1,15 +1,27 @@
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, Response, render_template, request, jsonify
+from werkzeug.middleware.proxy_fix import ProxyFix
 import pandas as pd
 import numpy as np
-import matplotlib
-matplotlib.use('Agg')  # Non-interactive backend
-import matplotlib.pyplot as plt
-import io
-import base64
 import os
-from model_energi import EnergyTransitionModel
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from model_energi import EnergyTransitionModel, CountryCube
+from plotting import create_asean_plot
+from atlas import ScenarioAtlas, simulation_payload, comparison_payload
+from jobs import JobManager, JobLimitError, JOB_RUNNERS
 
 app = Flask(__name__)
+
+# Di balik reverse proxy set TRUSTED_PROXY_COUNT ke jumlah proxy tepercaya
+# agar remote_addr berisi alamat client asli. Di Heroku (variabel DYNO ada)
+# nilai bawaannya 1 karena semua request melewati satu router. Header
+# X-Forwarded-For tidak pernah dibaca langsung karena bisa dipalsukan.
+TRUSTED_PROXY_COUNT = int(os.environ.get('TRUSTED_PROXY_COUNT',
+                                         1 if 'DYNO' in os.environ else 0))
+if TRUSTED_PROXY_COUNT > 0:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=TRUSTED_PROXY_COUNT)
 model = EnergyTransitionModel()
 
 # Load model yang sudah disimpan
@@ -22,146 +34,116 @@ except Exception as e:
     model.load_historical_data()
     model.create_scenarios()
 
-def create_plot(results, scenario_name, historical_data):
-    """Membuat plot hasil simulasi"""
-    try:
-        fig, ((ax1, ax2), (ax3, ax4)) = plt.subplots(2, 2, figsize=(12, 8))
-        
-        # Plot 1: Pangsa Energi Terbarukan
-        ax1.plot(historical_data['year'], historical_data['renewable_share'], 
-                 'bo-', label='Data Historis', linewidth=2)
-        ax1.plot(results['year'], results['renewable_share'], 
-                 'r-', label='Proyeksi', linewidth=2)
-        ax1.axhline(y=23, color='g', linestyle='--', label='Target 23%')
-        ax1.set_xlabel('Tahun')
-        ax1.set_ylabel('Pangsa Energi Terbarukan (%)')
-        ax1.set_title(f'Pangsa Energi Terbarukan - {scenario_name}')
-        ax1.legend()
-        ax1.grid(True, alpha=0.3)
-        
-        # Plot 2: Kapasitas Terpasang
-        ax2.plot(historical_data['year'], historical_data['renewable_capacity'], 
-                 'bo-', label='Data Historis', linewidth=2)
-        ax2.plot(results['year'], results['renewable_capacity'], 
-                 'r-', label='Proyeksi', linewidth=2)
-        ax2.set_xlabel('Tahun')
-        ax2.set_ylabel('Kapasitas Terbarukan (MW)')
-        ax2.set_title(f'Kapasitas Energi Terbarukan - {scenario_name}')
-        ax2.legend()
-        ax2.grid(True, alpha=0.3)
-        
-        # Plot 3: Investasi
-        ax3.plot(results['year'], results['investment'], 'g-', linewidth=2)
-        ax3.set_xlabel('Tahun')
-        ax3.set_ylabel('Tingkat Investasi')
-        ax3.set_title(f'Tingkat Investasi - {scenario_name}')
-        ax3.grid(True, alpha=0.3)
-        
-        # Plot 4: Infrastruktur
-        ax4.plot(results['year'], results['infrastructure'], 'm-', linewidth=2)
-        ax4.set_xlabel('Tahun')
-        ax4.set_ylabel('Tingkat Infrastruktur')
-        ax4.set_title(f'Perkembangan Infrastruktur - {scenario_name}')
-        ax4.grid(True, alpha=0.3)
-        
-        plt.tight_layout()
-        
-        # Convert plot to base64 for HTML
-        buf = io.BytesIO()
-        plt.savefig(buf, format='png', dpi=100, bbox_inches='tight')
-        buf.seek(0)
-        plot_url = base64.b64encode(buf.getvalue()).decode('utf8')
-        plt.close(fig)
-        
-        return plot_url
-    except Exception as e:
-        print(f"Error creating plot: {e}")
-        return None
+# Atlas respons yang dihitung saat build model
+atlas = ScenarioAtlas()
+try:
+    atlas.load(model, 'models/scenario_atlas')
+except Exception as e:
+    atlas = ScenarioAtlas()
+    print(f"Atlas tidak dimuat ({e}), memakai komputasi langsung")
+
+# Cube simulasi multi-negara, di-build saat deploy oleh bin/post_compile.
+# Jika tidak ada atau usang, cube dihitung sekali saat pertama dibutuhkan.
+country_cube_lock = threading.Lock()
+try:
+    model.country_cube = CountryCube.load('models/country_cube.npz', model.scenarios)
+    print("Cube negara berhasil dimuat!")
+except Exception as e:
+    print(f"Cube negara tidak dimuat ({e}), akan dihitung saat dibutuhkan")
 
-def create_comparison_plot(historical_data, all_results, scenarios):
-    """Membuat plot perbandingan semua skenario"""
+# Antrean job simulasi berdurasi panjang
+job_manager = JobManager(model, JOB_RUNNERS)
+
+# Thread pool untuk bagian /batch yang saling independen
+batch_executor = ThreadPoolExecutor(max_workers=4)
+MAX_BATCH_OPERATIONS = 8
+
+_proxy_warned = False
+
+def get_client_id():
+    """Identitas client untuk batas job dan stream"""
+    global _proxy_warned
+    if (TRUSTED_PROXY_COUNT == 0 and not _proxy_warned and
+            'X-Forwarded-For' in request.headers):
+        # Semua client di balik proxy akan berbagi satu batas job dan stream
+        _proxy_warned = True
+        print("Peringatan: request datang lewat proxy tetapi TRUSTED_PROXY_COUNT=0, "
+              "semua client memakai alamat proxy sebagai identitas")
+    return request.remote_addr
+
+@app.route('/')
+def index():
+    return render_template('index.html')
+
+@app.route('/simulate', methods=['POST'])
+def simulate():
     try:
-        fig, ax = plt.subplots(figsize=(12, 6))
-        
-        # Plot data historis
-        ax.plot(historical_data['year'], historical_data['renewable_share'], 
-                'ko-', label='Data Historis', linewidth=2)
+        data = request.get_json()
+        if not data:
+            return jsonify({'success': False, 'error': 'No JSON data received'})
+            
+        scenario_name = data.get('scenario', 'business_as_usual')
+        end_year = int(data.get('end_year', 2040))
         
-        # Plot setiap skenario
-        for scenario_name in scenarios.keys():
-            scenario_data = all_results[all_results['scenario'] == scenario_name]
-            if len(scenario_data) > 0:
-                scenario_info = scenarios[scenario_name]
-                ax.plot(scenario_data['year'], scenario_data['renewable_share'],
-                       label=scenario_info['name'], color=scenario_info['color'], linewidth=2)
+        # Validasi input
+        if end_year < 2025 or end_year > 2050:
+            return jsonify({'success': False, 'error': 'Tahun akhir harus antara 2025-2050'})
         
-        ax.axhline(y=23, color='red', linestyle='--', label='Target 23%', linewidth=2)
-        ax.set_xlabel('Tahun')
-        ax.set_ylabel('Pangsa Energi Terbarukan (%)')
-        ax.set_title('Perbandingan Semua Skenario Kebijakan')
-        ax.legend()
-        ax.grid(True, alpha=0.3)
+        # Ambil dari atlas jika tersedia
+        cached = atlas.get_simulation(scenario_name, end_year)
+        if cached is not None:
+            return app.response_class(cached, mimetype='application/json')
         
-        # Convert plot to base64
-        buf = io.BytesIO()
-        plt.savefig(buf, format='png', dpi=100, bbox_inches='tight')
-        buf.seek(0)
-        plot_url = base64.b64encode(buf.getvalue()).decode('utf8')
-        plt.close(fig)
+        response = simulation_payload(model, scenario_name, end_year,
+                                      model.get_initial_conditions())
         
-        return plot_url
     except Exception as e:
-        print(f"Error creating comparison plot: {e}")
-        return None
+        print(f"Error in simulate: {e}")
+        response = {
+            'success': False,
+            'error': str(e)
+        }
+    
+    return jsonify(response)
 
-def create_asean_plot(asean_comparison):
-    """Membuat plot perbandingan ASEAN"""
+@app.route('/compare', methods=['POST'])
+def compare_scenarios():
     try:
-        fig, ax = plt.subplots(figsize=(10, 6))
-        
-        countries = list(asean_comparison.keys())
-        shares = list(asean_comparison.values())
-        
-        # Warna berbeda untuk Indonesia
-        colors = ['#ff6b6b' if country == 'Indonesia' else '#4ecdc4' for country in countries]
-        
-        bars = ax.bar(countries, shares, color=colors, alpha=0.7)
+        data = request.get_json()
+        if not data:
+            return jsonify({'success': False, 'error': 'No JSON data received'})
+            
+        end_year = int(data.get('end_year', 2040))
         
-        # Tambahkan nilai di atas bar
-        for i, (bar, share) in enumerate(zip(bars, shares)):
-            height = bar.get_height()
-            ax.text(bar.get_x() + bar.get_width()/2., height + 0.5,
-                    f'{share:.1f}%', ha='center', va='bottom', fontweight='bold')
+        # Validasi input
+        if end_year < 2025 or end_year > 2050:
+            return jsonify({'success': False, 'error': 'Tahun akhir harus antara 2025-2050'})
         
-        ax.axhline(y=23, color='red', linestyle='--', label='Target Indonesia 23%')
-        ax.set_ylabel('Pangsa Energi Terbarukan (%)')
-        ax.set_title('Perbandingan Pangsa Energi Terbarukan ASEAN')
-        ax.legend()
-        ax.grid(True, alpha=0.3, axis='y')
+        # Ambil dari atlas jika tersedia
+        cached = atlas.get_comparison(end_year)
+        if cached is not None:
+            return app.response_class(cached, mimetype='application/json')
         
-        # Convert plot to base64
-        buf = io.BytesIO()
-        plt.savefig(buf, format='png', dpi=100, bbox_inches='tight')
-        buf.seek(0)
-        plot_url = base64.b64encode(buf.getvalue()).decode('utf8')
-        plt.close(fig)
+        response = comparison_payload(model, end_year, model.get_initial_conditions())
         
-        return plot_url
     except Exception as e:
-        print(f"Error creating ASEAN plot: {e}")
-        return None
-
-@app.route('/')
-def index():
-    return render_template('index.html')
+        print(f"Error in compare: {e}")
+        response = {
+            'success': False,
+            'error': str(e)
+        }
+    
+    return jsonify(response)
 
-@app.route('/simulate', methods=['POST'])
-def simulate():
+@app.route('/simulate_country', methods=['POST'])
+def simulate_country():
+    """Endpoint untuk hasil simulasi satu negara dari cube multi-negara"""
     try:
         data = request.get_json()
         if not data:
             return jsonify({'success': False, 'error': 'No JSON data received'})
             
+        country = data.get('country', 'Indonesia')
         scenario_name = data.get('scenario', 'business_as_usual')
         end_year = int(data.get('end_year', 2040))
         
@@ -169,45 +151,27 @@ def simulate():
         if end_year < 2025 or end_year > 2050:
             return jsonify({'success': False, 'error': 'Tahun akhir harus antara 2025-2050'})
         
-        # Initial conditions dari data terakhir
-        last_data = model.historical_data.iloc[-1]
-        initial_conditions = {
-            'renewable_capacity': float(last_data['renewable_capacity']),
-            'investment': 2.9,
-            'infrastructure': 50.0,
-            'total_capacity': float(last_data.get('total_capacity', 95400))
-        }
-        
-        # Run simulation
-        results = model.run_simulation(scenario_name, initial_conditions, end_year)
-        
-        # Create plot
-        plot_url = create_plot(results, 
-                             model.scenarios[scenario_name]['name'],
-                             model.historical_data)
-        
-        if plot_url is None:
-            return jsonify({'success': False, 'error': 'Gagal membuat plot'})
+        if model.country_cube is None:
+            with country_cube_lock:
+                if model.country_cube is None:
+                    model.run_country_batch(2050)
         
-        # Calculate key metrics - konversi boolean ke string untuk JSON
+        results = model.country_cube.query(country, scenario_name, end_year)
         final_share = float(results['renewable_share'].iloc[-1])
-        target_2025 = float(results[results['year'] == 2025]['renewable_share'].iloc[0])
         
         response = {
             'success': True,
-            'plot_url': f"data:image/png;base64,{plot_url}",
+            'country': country,
             'metrics': {
-                'target_2025': round(target_2025, 2),
                 'final_share': round(final_share, 2),
                 'final_capacity': int(results['renewable_capacity'].iloc[-1]),
-                'target_achieved_2025': "Ya" if target_2025 >= 23 else "Tidak",  # Boolean to string
                 'target_achieved_final': "Ya" if final_share >= 23 else "Tidak"   # Boolean to string
             },
             'results': results.where(pd.notnull(results), None).to_dict('records')  # Handle NaN values
         }
         
     except Exception as e:
-        print(f"Error in simulate: {e}")
+        print(f"Error in simulate_country: {e}")
         response = {
             'success': False,
             'error': str(e)
@@ -215,60 +179,41 @@ def simulate():
     
     return jsonify(response)
 
-@app.route('/compare', methods=['POST'])
-def compare_scenarios():
+@app.route('/jobs', methods=['POST'])
+def submit_job():
+    """Endpoint untuk mengirim job simulasi berdurasi panjang"""
     try:
         data = request.get_json()
         if not data:
             return jsonify({'success': False, 'error': 'No JSON data received'})
             
-        end_year = int(data.get('end_year', 2040))
+        job_type = data.get('type', 'scenarios')
+        end_year = int(data.get('end_year', 2050))
+        n_samples = int(data.get('n_samples', 200))
         
         # Validasi input
-        if end_year < 2025 or end_year > 2050:
-            return jsonify({'success': False, 'error': 'Tahun akhir harus antara 2025-2050'})
-        
-        # Initial conditions dari data terakhir
-        last_data = model.historical_data.iloc[-1]
-        initial_conditions = {
-            'renewable_capacity': float(last_data['renewable_capacity']),
-            'investment': 2.9,
-            'infrastructure': 50.0,
-            'total_capacity': float(last_data.get('total_capacity', 95400))
-        }
-        
-        # Run all scenarios
-        all_results = model.run_all_scenarios(initial_conditions, end_year)
-        
-        # Create comparison plot
-        plot_url = create_comparison_plot(model.historical_data, all_results, model.scenarios)
-        
-        if plot_url is None:
-            return jsonify({'success': False, 'error': 'Gagal membuat plot perbandingan'})
+        if end_year < 2025 or end_year > 2100:
+            return jsonify({'success': False, 'error': 'Tahun akhir harus antara 2025-2100'})
+        if n_samples < 1 or n_samples > 1000:
+            return jsonify({'success': False, 'error': 'Jumlah sampel harus antara 1-1000'})
         
-        # Calculate comparison metrics - konversi boolean ke string
-        comparison_metrics = {}
-        for scenario_name in model.scenarios.keys():
-            scenario_data = all_results[all_results['scenario'] == scenario_name]
-            if len(scenario_data) > 0:
-                share_2025 = float(scenario_data[scenario_data['year'] == 2025]['renewable_share'].iloc[0])
-                final_share = float(scenario_data['renewable_share'].iloc[-1])
-                
-                comparison_metrics[scenario_name] = {
-                    'name': model.scenarios[scenario_name]['name'],
-                    'share_2025': round(share_2025, 2),
-                    'final_share': round(final_share, 2),
-                    'target_2025_achieved': "Ya" if share_2025 >= 23 else "Tidak"  # Boolean to string
-                }
+        job = job_manager.submit(get_client_id(), job_type, {
+            'end_year': end_year,
+            'n_samples': n_samples,
+            'seed': data.get('seed')
+        })
         
         response = {
             'success': True,
-            'plot_url': f"data:image/png;base64,{plot_url}",
-            'comparison_metrics': comparison_metrics
+            'job_id': job.id,
+            'events_url': f'/jobs/{job.id}/events'
         }
         
+    except JobLimitError as e:
+        return jsonify({'success': False, 'error': str(e)}), 429
+        
     except Exception as e:
-        print(f"Error in compare: {e}")
+        print(f"Error in submit_job: {e}")
         response = {
             'success': False,
             'error': str(e)
@@ -276,21 +221,58 @@ def compare_scenarios():
     
     return jsonify(response)
 
+@app.route('/jobs/<job_id>/events', methods=['GET'])
+def job_events(job_id):
+    """Stream SSE berisi hasil bertahap sebuah job"""
+    try:
+        stream = job_manager.open_stream(job_id, get_client_id())
+    except JobLimitError as e:
+        return jsonify({'success': False, 'error': str(e)}), 429
+    
+    if stream is None:
+        return jsonify({'success': False, 'error': 'Job tidak ditemukan'}), 404
+    
+    return Response(stream, mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/jobs/<job_id>/cancel', methods=['POST'])
+def cancel_job(job_id):
+    """Endpoint untuk membatalkan job"""
+    job = job_manager.cancel(job_id)
+    if job is None:
+        return jsonify({'success': False, 'error': 'Job tidak ditemukan'}), 404
+    
+    return jsonify({'success': True, 'job_id': job.id})
+
+def asean_payload():
+    """Membuat respons /asean"""
+    asean_data = model.get_asean_comparison()
+    plot_url = create_asean_plot(asean_data)
+    
+    if plot_url is None:
+        return {'success': False, 'error': 'Gagal membuat plot ASEAN'}
+    
+    return {
+        'success': True,
+        'plot_url': f"data:image/png;base64,{plot_url}",
+        'asean_data': asean_data
+    }
+
+def historical_payload():
+    """Membuat respons /data"""
+    # Konversi NaN ke None untuk JSON serialization
+    historical_data = model.historical_data.where(pd.notnull(model.historical_data), None).to_dict('records')
+    
+    return {
+        'success': True,
+        'historical_data': historical_data
+    }
+
 @app.route('/asean', methods=['GET'])
 def asean_comparison():
     """Endpoint untuk data perbandingan ASEAN"""
     try:
-        asean_data = model.get_asean_comparison()
-        plot_url = create_asean_plot(asean_data)
-        
-        if plot_url is None:
-            return jsonify({'success': False, 'error': 'Gagal membuat plot ASEAN'})
-        
-        response = {
-            'success': True,
-            'plot_url': f"data:image/png;base64,{plot_url}",
-            'asean_data': asean_data
-        }
+        response = asean_payload()
         
     except Exception as e:
         print(f"Error in asean: {e}")
@@ -305,13 +287,7 @@ def asean_comparison():
 def get_historical_data():
     """Endpoint untuk data historis"""
     try:
-        # Konversi NaN ke None untuk JSON serialization
-        historical_data = model.historical_data.where(pd.notnull(model.historical_data), None).to_dict('records')
-        
-        response = {
-            'success': True,
-            'historical_data': historical_data
-        }
+        response = historical_payload()
         
     except Exception as e:
         print(f"Error in data: {e}")
@@ -322,6 +298,112 @@ def get_historical_data():
     
     return jsonify(response)
 
+def _batch_key(operation):
+    """Key unik operasi /batch, sekaligus validasi input"""
+    op = operation.get('op')
+    if op in ('simulate', 'compare'):
+        end_year = int(operation.get('end_year', 2040))
+        if end_year < 2025 or end_year > 2050:
+            raise ValueError('Tahun akhir harus antara 2025-2050')
+        if op == 'simulate':
+            scenario_name = operation.get('scenario', 'business_as_usual')
+            if not isinstance(scenario_name, str):
+                raise ValueError('Skenario harus berupa string')
+            return (op, scenario_name, end_year)
+        return (op, end_year)
+    if op in ('asean', 'data'):
+        return (op,)
+    raise ValueError(f"Operasi {op} tidak ditemukan")
+
+def _encode_payload(task):
+    """Menjalankan satu bagian /batch dan mengembalikan byte JSON-nya"""
+    try:
+        return json.dumps(task()).encode('utf8')
+    except Exception as e:
+        print(f"Error in batch: {e}")
+        return json.dumps({'success': False, 'error': str(e)}).encode('utf8')
+
+def _shared_simulation_payload(scenario_name, end_year, initial_conditions, all_results):
+    """Respons /simulate dari potongan hasil run_all_scenarios"""
+    if scenario_name not in model.scenarios:
+        raise ValueError(f"Skenario {scenario_name} tidak ditemukan")
+    results = all_results[all_results['scenario'] == scenario_name].reset_index(drop=True)
+    return simulation_payload(model, scenario_name, end_year, initial_conditions, results=results)
+
+@app.route('/batch', methods=['POST'])
+def batch():
+    """Endpoint untuk beberapa operasi sekaligus dalam satu respons
+
+    Operasi yang sama hanya dihitung sekali, simulate dan compare dengan
+    tahun akhir yang sama memakai satu run_all_scenarios, dan bagian yang
+    independen dihitung paralel.
+    """
+    data = request.get_json(silent=True)
+    operations = data.get('operations') if isinstance(data, dict) else None
+    if not isinstance(operations, list) or not operations:
+        return jsonify({'success': False, 'error': 'No operations received'})
+    if len(operations) > MAX_BATCH_OPERATIONS:
+        return jsonify({'success': False, 'error': f'Maksimal {MAX_BATCH_OPERATIONS} operasi per batch'})
+    
+    keys = []
+    parts = {}
+    for operation in operations:
+        try:
+            key = _batch_key(operation)
+        except Exception as e:
+            key = ('invalid', len(keys))
+            parts[key] = json.dumps({'success': False, 'error': str(e)}).encode('utf8')
+        keys.append(key)
+    
+    # Ambil dari atlas jika tersedia
+    for key in set(keys) - set(parts):
+        if key[0] == 'simulate':
+            cached = atlas.get_simulation(key[1], key[2])
+        elif key[0] == 'compare':
+            cached = atlas.get_comparison(key[1])
+        else:
+            continue
+        if cached is not None:
+            parts[key] = cached
+    
+    pending = set(keys) - set(parts)
+    initial_conditions = model.get_initial_conditions()
+    
+    # Tahap 1: satu run_all_scenarios per tahun akhir, plus operasi tanpa simulasi
+    end_years = {key[-1] for key in pending if key[0] in ('simulate', 'compare')}
+    shared = {end_year: batch_executor.submit(model.run_all_scenarios, initial_conditions, end_year)
+              for end_year in end_years}
+    futures = {}
+    if ('asean',) in pending:
+        futures[('asean',)] = batch_executor.submit(_encode_payload, asean_payload)
+    if ('data',) in pending:
+        futures[('data',)] = batch_executor.submit(_encode_payload, historical_payload)
+    
+    # Tahap 2: plot dan metrik dari hasil simulasi bersama
+    for key in pending:
+        if key[0] not in ('simulate', 'compare'):
+            continue
+        end_year = key[-1]
+        try:
+            all_results = shared[end_year].result()
+        except Exception as e:
+            print(f"Error in batch: {e}")
+            parts[key] = json.dumps({'success': False, 'error': str(e)}).encode('utf8')
+            continue
+        
+        if key[0] == 'simulate':
+            task = partial(_shared_simulation_payload, key[1], key[2], initial_conditions, all_results)
+        else:
+            task = partial(comparison_payload, model, key[1], initial_conditions, all_results=all_results)
+        futures[key] = batch_executor.submit(_encode_payload, task)
+    
+    for key, future in futures.items():
+        parts[key] = future.result()
+    
+    # Bagian yang sudah berupa JSON digabung tanpa serialisasi ulang
+    body = b'{"success": true, "results": [' + b', '.join(parts[key] for key in keys) + b']}'
+    return app.response_class(body, mimetype='application/json')
+
 if __name__ == '__main__':
     # Pastikan folder ada
     os.makedirs('models', exist_ok=True)
@@ -0,0 +1,217 @@
+"""Atlas skenario: respons /simulate dan /compare yang dihitung saat build model
+
+Atlas dibangun tanpa menulis ulang file model dengan:
+
+    python atlas.py
+
+Saat deploy ke Heroku langkah ini dijalankan oleh `bin/post_compile`
+sehingga bundle ikut masuk ke slug.
+"""
+import pandas as pd
+import numpy as np
+import hashlib
+import json
+import os
+import matplotlib
+import plotting
+from plotting import create_plot, create_comparison_plot
+
+# Ruang input yang dicakup atlas (sama dengan validasi di route)
+ATLAS_START_YEAR = 2025
+ATLAS_END_YEAR = 2050
+
+# Kode yang menentukan isi atlas; perubahan apa pun membuat atlas lama ditolak
+ATLAS_SOURCES = [plotting.__file__, __file__,
+                 os.path.join(os.path.dirname(os.path.abspath(__file__)), 'model_energi.py')]
+
+def simulation_payload(model, scenario_name, end_year, initial_conditions, results=None):
+    """Membuat respons /simulate untuk satu skenario
+
+    `results` dapat diisi hasil simulasi yang sudah ada (misalnya potongan
+    dari run_all_scenarios) agar skenario tidak diintegrasikan dua kali.
+    """
+    # Run simulation
+    if results is None:
+        results = model.run_simulation(scenario_name, initial_conditions, end_year)
+
+    # Create plot
+    plot_url = create_plot(results,
+                         model.scenarios[scenario_name]['name'],
+                         model.historical_data)
+
+    if plot_url is None:
+        return {'success': False, 'error': 'Gagal membuat plot'}
+
+    # Calculate key metrics - konversi boolean ke string untuk JSON
+    final_share = float(results['renewable_share'].iloc[-1])
+    target_2025 = float(results[results['year'] == 2025]['renewable_share'].iloc[0])
+
+    return {
+        'success': True,
+        'plot_url': f"data:image/png;base64,{plot_url}",
+        'metrics': {
+            'target_2025': round(target_2025, 2),
+            'final_share': round(final_share, 2),
+            'final_capacity': int(results['renewable_capacity'].iloc[-1]),
+            'target_achieved_2025': "Ya" if target_2025 >= 23 else "Tidak",  # Boolean to string
+            'target_achieved_final': "Ya" if final_share >= 23 else "Tidak"   # Boolean to string
+        },
+        'results': results.where(pd.notnull(results), None).to_dict('records')  # Handle NaN values
+    }
+
+def comparison_payload(model, end_year, initial_conditions, all_results=None):
+    """Membuat respons /compare untuk semua skenario"""
+    # Run all scenarios
+    if all_results is None:
+        all_results = model.run_all_scenarios(initial_conditions, end_year)
+
+    # Create comparison plot
+    plot_url = create_comparison_plot(model.historical_data, all_results, model.scenarios)
+
+    if plot_url is None:
+        return {'success': False, 'error': 'Gagal membuat plot perbandingan'}
+
+    # Calculate comparison metrics - konversi boolean ke string
+    comparison_metrics = {}
+    for scenario_name in model.scenarios.keys():
+        scenario_data = all_results[all_results['scenario'] == scenario_name]
+        if len(scenario_data) > 0:
+            share_2025 = float(scenario_data[scenario_data['year'] == 2025]['renewable_share'].iloc[0])
+            final_share = float(scenario_data['renewable_share'].iloc[-1])
+
+            comparison_metrics[scenario_name] = {
+                'name': model.scenarios[scenario_name]['name'],
+                'share_2025': round(share_2025, 2),
+                'final_share': round(final_share, 2),
+                'target_2025_achieved': "Ya" if share_2025 >= 23 else "Tidak"  # Boolean to string
+            }
+
+    return {
+        'success': True,
+        'plot_url': f"data:image/png;base64,{plot_url}",
+        'comparison_metrics': comparison_metrics
+    }
+
+def _historical_hash(historical_data):
+    """Hash isi data historis yang digambar di setiap grafik"""
+    return hashlib.sha256(historical_data.to_csv(index=False).encode('utf8')).hexdigest()
+
+def _code_hash():
+    """Hash source simulasi/plotting beserta versi matplotlib"""
+    digest = hashlib.sha256(matplotlib.__version__.encode('utf8'))
+    for source in ATLAS_SOURCES:
+        with open(source, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+def _blob_hash(blob):
+    return hashlib.sha256(memoryview(blob)).hexdigest()
+
+def _atlas_key(route, *args):
+    return '/'.join([route] + [str(arg) for arg in args])
+
+def build_scenario_atlas(model, path='models/scenario_atlas'):
+    """Menghitung semua respons /simulate dan /compare lalu menyimpannya sebagai bundle
+
+    Bundle terdiri dari `<path>.npy` (blob byte JSON yang digabung) dan
+    `<path>.json` (indeks key -> [offset, panjang] beserta parameter model).
+    Kedua file ditulis ke file sementara lalu diganti dengan os.replace;
+    indeks menyimpan hash blob sehingga pasangan yang tidak cocok ditolak.
+    """
+    initial_conditions = model.get_initial_conditions()
+    index = {}
+    chunks = []
+    offset = 0
+
+    def add(key, payload):
+        nonlocal offset
+        if not payload.get('success'):
+            print(f"Atlas: {key} dilewati ({payload.get('error')})")
+            return
+        data = json.dumps(payload).encode('utf8')
+        index[key] = [offset, len(data)]
+        chunks.append(data)
+        offset += len(data)
+
+    for end_year in range(ATLAS_START_YEAR, ATLAS_END_YEAR + 1):
+        for scenario_name in model.scenarios.keys():
+            add(_atlas_key('simulate', scenario_name, end_year),
+                simulation_payload(model, scenario_name, end_year, initial_conditions))
+        add(_atlas_key('compare', end_year),
+            comparison_payload(model, end_year, initial_conditions))
+
+    blob = np.frombuffer(b''.join(chunks), dtype=np.uint8)
+    with open(f'{path}.npy.tmp', 'wb') as f:
+        np.save(f, blob)
+
+    with open(f'{path}.json.tmp', 'w') as f:
+        json.dump({
+            'code_hash': _code_hash(),
+            'historical_hash': _historical_hash(model.historical_data),
+            'blob_size': len(blob),
+            'blob_hash': _blob_hash(blob),
+            'scenarios': model.scenarios,
+            'initial_conditions': initial_conditions,
+            'entries': index
+        }, f)
+
+    os.replace(f'{path}.npy.tmp', f'{path}.npy')
+    os.replace(f'{path}.json.tmp', f'{path}.json')
+    print(f"Atlas skenario disimpan sebagai {path}.npy ({len(index)} entri)")
+    return index
+
+class ScenarioAtlas:
+    """Membaca bundle atlas secara memory-mapped"""
+    def __init__(self):
+        self.entries = {}
+        self.blob = None
+
+    def load(self, model, path='models/scenario_atlas'):
+        """Memuat atlas jika ada dan masih sesuai dengan model"""
+        if not (os.path.exists(f'{path}.npy') and os.path.exists(f'{path}.json')):
+            print(f"Atlas {path} tidak ditemukan, memakai komputasi langsung")
+            return self
+
+        with open(f'{path}.json') as f:
+            index = json.load(f)
+
+        # Atlas dari model, kode atau versi rendering lain tidak boleh dipakai
+        if (index.get('code_hash') != _code_hash() or
+                index.get('historical_hash') != _historical_hash(model.historical_data) or
+                index.get('scenarios') != model.scenarios or
+                index.get('initial_conditions') != model.get_initial_conditions()):
+            print(f"Atlas {path} tidak sesuai dengan model, memakai komputasi langsung")
+            return self
+
+        # Blob harus berasal dari build yang sama dengan indeks
+        blob = np.load(f'{path}.npy', mmap_mode='r')
+        if len(blob) != index.get('blob_size') or _blob_hash(blob) != index.get('blob_hash'):
+            print(f"Atlas {path} tidak cocok dengan indeksnya, memakai komputasi langsung")
+            return self
+
+        self.blob = blob
+        self.entries = index['entries']
+        print(f"Atlas dimuat dari {path} ({len(self.entries)} entri)")
+        return self
+
+    def _get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        offset, length = entry
+        return self.blob[offset:offset + length].tobytes()
+
+    def get_simulation(self, scenario_name, end_year):
+        """Byte JSON respons /simulate, atau None jika di luar atlas"""
+        return self._get(_atlas_key('simulate', scenario_name, end_year))
+
+    def get_comparison(self, end_year):
+        """Byte JSON respons /compare, atau None jika di luar atlas"""
+        return self._get(_atlas_key('compare', end_year))
+
+if __name__ == "__main__":
+    # Bangun atlas dari model tersimpan tanpa mengubah file model
+    from model_energi import EnergyTransitionModel
+    model = EnergyTransitionModel().load_model('models/energy_model.joblib')
+    os.makedirs('models', exist_ok=True)
+    build_scenario_atlas(model, 'models/scenario_atlas')
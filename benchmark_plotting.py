@@ -0,0 +1,195 @@
+"""Benchmark latensi plot: jalur pyplot lama vs template di plotting.py
+
+Jalur lama (pyplot, figure dibuat dan ditutup per request) disalin apa
+adanya dari app.py sebelum template figure diperkenalkan. Jalankan dari
+root repo:
+
+    python benchmark_plotting.py --repeat 20
+"""
+import matplotlib
+matplotlib.use('Agg')  # Non-interactive backend
+import matplotlib.pyplot as plt
+import argparse
+import statistics
+import time
+import io
+import base64
+import plotting
+from model_energi import EnergyTransitionModel
+
+# Jalur lama (referensi)
+def pyplot_create_plot(results, scenario_name, historical_data):
+    """Membuat plot hasil simulasi"""
+    try:
+        fig, ((ax1, ax2), (ax3, ax4)) = plt.subplots(2, 2, figsize=(12, 8))
+        
+        # Plot 1: Pangsa Energi Terbarukan
+        ax1.plot(historical_data['year'], historical_data['renewable_share'], 
+                 'bo-', label='Data Historis', linewidth=2)
+        ax1.plot(results['year'], results['renewable_share'], 
+                 'r-', label='Proyeksi', linewidth=2)
+        ax1.axhline(y=23, color='g', linestyle='--', label='Target 23%')
+        ax1.set_xlabel('Tahun')
+        ax1.set_ylabel('Pangsa Energi Terbarukan (%)')
+        ax1.set_title(f'Pangsa Energi Terbarukan - {scenario_name}')
+        ax1.legend()
+        ax1.grid(True, alpha=0.3)
+        
+        # Plot 2: Kapasitas Terpasang
+        ax2.plot(historical_data['year'], historical_data['renewable_capacity'], 
+                 'bo-', label='Data Historis', linewidth=2)
+        ax2.plot(results['year'], results['renewable_capacity'], 
+                 'r-', label='Proyeksi', linewidth=2)
+        ax2.set_xlabel('Tahun')
+        ax2.set_ylabel('Kapasitas Terbarukan (MW)')
+        ax2.set_title(f'Kapasitas Energi Terbarukan - {scenario_name}')
+        ax2.legend()
+        ax2.grid(True, alpha=0.3)
+        
+        # Plot 3: Investasi
+        ax3.plot(results['year'], results['investment'], 'g-', linewidth=2)
+        ax3.set_xlabel('Tahun')
+        ax3.set_ylabel('Tingkat Investasi')
+        ax3.set_title(f'Tingkat Investasi - {scenario_name}')
+        ax3.grid(True, alpha=0.3)
+        
+        # Plot 4: Infrastruktur
+        ax4.plot(results['year'], results['infrastructure'], 'm-', linewidth=2)
+        ax4.set_xlabel('Tahun')
+        ax4.set_ylabel('Tingkat Infrastruktur')
+        ax4.set_title(f'Perkembangan Infrastruktur - {scenario_name}')
+        ax4.grid(True, alpha=0.3)
+        
+        plt.tight_layout()
+        
+        # Convert plot to base64 for HTML
+        buf = io.BytesIO()
+        plt.savefig(buf, format='png', dpi=100, bbox_inches='tight')
+        buf.seek(0)
+        plot_url = base64.b64encode(buf.getvalue()).decode('utf8')
+        plt.close(fig)
+        
+        return plot_url
+    except Exception as e:
+        print(f"Error creating plot: {e}")
+        return None
+
+def pyplot_create_comparison_plot(historical_data, all_results, scenarios):
+    """Membuat plot perbandingan semua skenario"""
+    try:
+        fig, ax = plt.subplots(figsize=(12, 6))
+        
+        # Plot data historis
+        ax.plot(historical_data['year'], historical_data['renewable_share'], 
+                'ko-', label='Data Historis', linewidth=2)
+        
+        # Plot setiap skenario
+        for scenario_name in scenarios.keys():
+            scenario_data = all_results[all_results['scenario'] == scenario_name]
+            if len(scenario_data) > 0:
+                scenario_info = scenarios[scenario_name]
+                ax.plot(scenario_data['year'], scenario_data['renewable_share'],
+                       label=scenario_info['name'], color=scenario_info['color'], linewidth=2)
+        
+        ax.axhline(y=23, color='red', linestyle='--', label='Target 23%', linewidth=2)
+        ax.set_xlabel('Tahun')
+        ax.set_ylabel('Pangsa Energi Terbarukan (%)')
+        ax.set_title('Perbandingan Semua Skenario Kebijakan')
+        ax.legend()
+        ax.grid(True, alpha=0.3)
+        
+        # Convert plot to base64
+        buf = io.BytesIO()
+        plt.savefig(buf, format='png', dpi=100, bbox_inches='tight')
+        buf.seek(0)
+        plot_url = base64.b64encode(buf.getvalue()).decode('utf8')
+        plt.close(fig)
+        
+        return plot_url
+    except Exception as e:
+        print(f"Error creating comparison plot: {e}")
+        return None
+
+def pyplot_create_asean_plot(asean_comparison):
+    """Membuat plot perbandingan ASEAN"""
+    try:
+        fig, ax = plt.subplots(figsize=(10, 6))
+        
+        countries = list(asean_comparison.keys())
+        shares = list(asean_comparison.values())
+        
+        # Warna berbeda untuk Indonesia
+        colors = ['#ff6b6b' if country == 'Indonesia' else '#4ecdc4' for country in countries]
+        
+        bars = ax.bar(countries, shares, color=colors, alpha=0.7)
+        
+        # Tambahkan nilai di atas bar
+        for i, (bar, share) in enumerate(zip(bars, shares)):
+            height = bar.get_height()
+            ax.text(bar.get_x() + bar.get_width()/2., height + 0.5,
+                    f'{share:.1f}%', ha='center', va='bottom', fontweight='bold')
+        
+        ax.axhline(y=23, color='red', linestyle='--', label='Target Indonesia 23%')
+        ax.set_ylabel('Pangsa Energi Terbarukan (%)')
+        ax.set_title('Perbandingan Pangsa Energi Terbarukan ASEAN')
+        ax.legend()
+        ax.grid(True, alpha=0.3, axis='y')
+        
+        # Convert plot to base64
+        buf = io.BytesIO()
+        plt.savefig(buf, format='png', dpi=100, bbox_inches='tight')
+        buf.seek(0)
+        plot_url = base64.b64encode(buf.getvalue()).decode('utf8')
+        plt.close(fig)
+        
+        return plot_url
+    except Exception as e:
+        print(f"Error creating ASEAN plot: {e}")
+        return None
+
+def time_calls(func, args_list, repeat):
+    """Median dan p90 (ms) dari `repeat` panggilan, setelah satu pemanasan"""
+    func(*args_list[0])
+    timings = []
+    for i in range(repeat):
+        args = args_list[i % len(args_list)]
+        start = time.perf_counter()
+        if func(*args) is None:
+            raise RuntimeError(f"{func.__name__} gagal membuat plot")
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return statistics.median(timings), timings[int(0.9 * (len(timings) - 1))]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--end-year', type=int, default=2040)
+    args = parser.parse_args()
+
+    model = EnergyTransitionModel().load_model('models/energy_model.joblib')
+    initial_conditions = model.get_initial_conditions()
+    all_results = model.run_all_scenarios(initial_conditions, args.end_year)
+    asean = model.get_asean_comparison()
+
+    # Skenario diganti tiap panggilan agar template benar-benar diperbarui
+    simulation_args = [
+        (all_results[all_results['scenario'] == name].reset_index(drop=True),
+         model.scenarios[name]['name'], model.historical_data)
+        for name in model.scenarios
+    ]
+    cases = [
+        ('create_plot', pyplot_create_plot, plotting.create_plot, simulation_args),
+        ('create_comparison_plot', pyplot_create_comparison_plot, plotting.create_comparison_plot,
+         [(model.historical_data, all_results, model.scenarios)]),
+        ('create_asean_plot', pyplot_create_asean_plot, plotting.create_asean_plot, [(asean,)])
+    ]
+
+    print(f"{'plot':<24}{'pyplot med':>12}{'p90':>9}{'template med':>14}{'p90':>9}{'speedup':>9}")
+    for name, old, new, args_list in cases:
+        old_med, old_p90 = time_calls(old, args_list, args.repeat)
+        new_med, new_p90 = time_calls(new, args_list, args.repeat)
+        print(f"{name:<24}{old_med:>10.1f}ms{old_p90:>7.1f}ms{new_med:>12.1f}ms{new_p90:>7.1f}ms"
+              f"{old_med / new_med:>8.2f}x")
+
+if __name__ == "__main__":
+    main()
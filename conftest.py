@@ -0,0 +1 @@
+# Menambahkan root repo ke sys.path agar modul aplikasi bisa diimpor dari tests/
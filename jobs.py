@@ -0,0 +1,292 @@
+"""Job simulasi berdurasi panjang dengan hasil bertahap via Server-Sent Events"""
+import numpy as np
+import pandas as pd
+import threading
+import queue
+import uuid
+import json
+import time
+import os
+
+# Batas antrean agar job berat tidak mengganggu /simulate interaktif
+MAX_QUEUED_JOBS = 8
+MAX_JOBS_PER_CLIENT = 2
+JOB_WORKERS = 1
+MAX_FINISHED_JOBS = 50
+KEEPALIVE_SECONDS = 15
+
+# Setiap stream SSE menahan satu thread gunicorn selama job berjalan.
+# WEB_THREADS harus sama dengan --threads di Procfile; separuhnya selalu
+# disisakan untuk request interaktif seperti /simulate.
+WEB_THREADS = int(os.environ.get('WEB_THREADS', 8))
+MAX_OPEN_STREAMS = max(1, WEB_THREADS // 2)
+MAX_STREAMS_PER_CLIENT = 2
+MAX_STREAMS_PER_JOB = 1
+
+class JobLimitError(Exception):
+    """Antrean penuh atau batas job per client terlampaui"""
+
+class JobCancelled(Exception):
+    """Job dibatalkan oleh client"""
+
+class Job:
+    """Satu job beserta daftar event yang sudah dihasilkan"""
+    TERMINAL_EVENTS = ('done', 'error', 'cancelled')
+
+    def __init__(self, client_id, job_type, params):
+        self.id = uuid.uuid4().hex
+        self.client_id = client_id
+        self.job_type = job_type
+        self.params = params
+        self.status = 'queued'
+        self.created_at = time.time()
+        self.events = []
+        self._cancel = threading.Event()
+        self._condition = threading.Condition()
+
+    @property
+    def finished(self):
+        return self.status in ('done', 'error', 'cancelled')
+
+    def emit(self, event, data):
+        """Menambahkan event dan membangunkan semua stream yang menunggu"""
+        with self._condition:
+            self.events.append((event, data))
+            if event in self.TERMINAL_EVENTS:
+                self.status = event
+            self._condition.notify_all()
+
+    def cancel(self):
+        self._cancel.set()
+
+    def check_cancelled(self):
+        """Dipanggil runner di antara langkah komputasi"""
+        if self._cancel.is_set():
+            raise JobCancelled()
+
+    def stream(self):
+        """Generator pesan SSE, dimulai dari event pertama"""
+        index = 0
+        while True:
+            with self._condition:
+                if index >= len(self.events):
+                    self._condition.wait(timeout=KEEPALIVE_SECONDS)
+                pending = self.events[index:]
+                index += len(pending)
+
+            if not pending:
+                yield ": keep-alive\n\n"
+                continue
+
+            for event, data in pending:
+                yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+                if event in self.TERMINAL_EVENTS:
+                    return
+
+class JobStream:
+    """Iterable respons SSE yang melepas slot stream saat selesai atau ditutup"""
+    def __init__(self, release, events):
+        self._release = release
+        self._events = events
+        self._closed = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        try:
+            return next(self._events)
+        except StopIteration:
+            self.close()
+            raise
+
+    def close(self):
+        if not self._closed:
+            self._closed = True
+            self._events.close()
+            self._release()
+
+class JobManager:
+    """Antrean job terbatas dengan worker thread di belakang"""
+    def __init__(self, model, runners, max_queued=MAX_QUEUED_JOBS,
+                 max_per_client=MAX_JOBS_PER_CLIENT, workers=JOB_WORKERS):
+        self.model = model
+        self.runners = runners
+        self.max_per_client = max_per_client
+        self.max_queued = max_queued
+        self.jobs = {}
+        # Batas antrean dihitung dari job yang belum selesai, bukan isi Queue:
+        # job yang dibatalkan saat antre langsung melepas tempatnya
+        self._queue = queue.Queue()
+        self._queued = 0
+        self._lock = threading.Lock()
+        self._open_streams = 0
+        self._streams_per_client = {}
+        self._streams_per_job = {}
+        for _ in range(workers):
+            threading.Thread(target=self._worker, daemon=True).start()
+
+    def submit(self, client_id, job_type, params):
+        """Memasukkan job ke antrean, JobLimitError jika batas terlampaui"""
+        if job_type not in self.runners:
+            raise ValueError(f"Tipe job {job_type} tidak ditemukan")
+
+        with self._lock:
+            active = sum(1 for job in self.jobs.values()
+                         if job.client_id == client_id and not job.finished)
+            if active >= self.max_per_client:
+                raise JobLimitError(f"Maksimal {self.max_per_client} job aktif per client")
+
+            if self._queued >= self.max_queued:
+                raise JobLimitError("Antrean job penuh, coba lagi nanti")
+
+            # Event 'queued' dikirim sebelum worker bisa mengambil job
+            job = Job(client_id, job_type, params)
+            self._queued += 1
+            job.emit('queued', {'job_id': job.id, 'position': self._queued})
+            self.jobs[job.id] = job
+            self._prune()
+            self._queue.put_nowait(job)
+
+        return job
+
+    def get(self, job_id):
+        return self.jobs.get(job_id)
+
+    def open_stream(self, job_id, client_id):
+        """Membuka stream SSE job, JobLimitError jika batas stream terlampaui"""
+        with self._lock:
+            job = self.jobs.get(job_id)
+            if job is None:
+                return None
+            if self._open_streams >= MAX_OPEN_STREAMS:
+                raise JobLimitError("Terlalu banyak stream terbuka, coba lagi nanti")
+            if self._streams_per_client.get(client_id, 0) >= MAX_STREAMS_PER_CLIENT:
+                raise JobLimitError(f"Maksimal {MAX_STREAMS_PER_CLIENT} stream terbuka per client")
+            if self._streams_per_job.get(job_id, 0) >= MAX_STREAMS_PER_JOB:
+                raise JobLimitError("Job ini sudah memiliki stream terbuka")
+
+            self._open_streams += 1
+            self._streams_per_client[client_id] = self._streams_per_client.get(client_id, 0) + 1
+            self._streams_per_job[job_id] = self._streams_per_job.get(job_id, 0) + 1
+
+        def release():
+            with self._lock:
+                self._open_streams -= 1
+                self._decrement(self._streams_per_client, client_id)
+                self._decrement(self._streams_per_job, job_id)
+
+        return JobStream(release, job.stream())
+
+    @staticmethod
+    def _decrement(counts, key):
+        counts[key] -= 1
+        if counts[key] == 0:
+            del counts[key]
+
+    def cancel(self, job_id):
+        """Membatalkan job; job yang masih antre langsung selesai"""
+        job = self.jobs.get(job_id)
+        if job is None:
+            return None
+        job.cancel()
+        with self._lock:
+            if job.status == 'queued':
+                self._queued -= 1
+                job.emit('cancelled', {'job_id': job.id})
+        return job
+
+    def _prune(self):
+        """Membuang job selesai yang paling lama"""
+        finished = [job for job in self.jobs.values() if job.finished]
+        finished.sort(key=lambda job: job.created_at)
+        for job in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self.jobs[job.id]
+
+    def _worker(self):
+        while True:
+            job = self._queue.get()
+            with self._lock:
+                if job.finished:
+                    continue
+                self._queued -= 1
+                job.status = 'running'
+
+            try:
+                job.check_cancelled()
+                result = self.runners[job.job_type](self.model, job, job.params)
+                job.emit('done', result)
+            except JobCancelled:
+                job.emit('cancelled', {'job_id': job.id})
+            except Exception as e:
+                print(f"Error in job {job.id}: {e}")
+                job.emit('error', {'error': str(e)})
+
+def run_scenarios_job(model, job, params):
+    """Menjalankan semua skenario satu per satu dan mengirim tiap trajektori"""
+    end_year = params['end_year']
+    initial_conditions = model.get_initial_conditions()
+    scenario_names = list(model.scenarios.keys())
+    summary = {}
+
+    for i, scenario_name in enumerate(scenario_names):
+        job.check_cancelled()
+        results = model.run_simulation(scenario_name, initial_conditions, end_year)
+        final_share = float(results['renewable_share'].iloc[-1])
+        summary[scenario_name] = round(final_share, 2)
+
+        job.emit('scenario', {
+            'scenario': scenario_name,
+            'name': model.scenarios[scenario_name]['name'],
+            'final_share': round(final_share, 2),
+            'results': results.where(pd.notnull(results), None).to_dict('records')
+        })
+        job.emit('progress', {'completed': i + 1, 'total': len(scenario_names)})
+
+    return {'final_share': summary}
+
+def run_ensemble_job(model, job, params):
+    """Ensemble Monte Carlo parameter skenario dengan persentil berjalan"""
+    end_year = params['end_year']
+    n_samples = params['n_samples']
+    spread = params.get('spread', 0.1)
+    chunk = 25
+
+    initial_conditions = model.get_initial_conditions()
+    scenario_names = list(model.scenarios.keys())
+    rng = np.random.default_rng(params.get('seed'))
+    perturbed = ['investment_growth', 'tech_improvement', 'policy_effectiveness']
+    total = n_samples * len(scenario_names)
+    completed = 0
+    summary = {}
+
+    for scenario_name in scenario_names:
+        base = model.scenarios[scenario_name]
+        shares = []
+        for sample in range(n_samples):
+            job.check_cancelled()
+            # Gangguan lognormal pada parameter kebijakan
+            overrides = {key: base[key] * float(rng.lognormal(0, spread)) for key in perturbed}
+            results = model.run_simulation(scenario_name, initial_conditions, end_year, overrides)
+            shares.append(results['renewable_share'].to_numpy())
+            completed += 1
+
+            if (sample + 1) % chunk == 0 or sample + 1 == n_samples:
+                p10, p50, p90 = np.percentile(np.array(shares), [10, 50, 90], axis=0)
+                summary[scenario_name] = {
+                    'name': base['name'],
+                    'samples': len(shares),
+                    'year': results['year'].tolist(),
+                    'p10': np.round(p10, 2).tolist(),
+                    'p50': np.round(p50, 2).tolist(),
+                    'p90': np.round(p90, 2).tolist()
+                }
+                job.emit('percentiles', {'scenario': scenario_name, **summary[scenario_name]})
+                job.emit('progress', {'completed': completed, 'total': total})
+
+    return {'percentiles': summary}
+
+JOB_RUNNERS = {
+    'scenarios': run_scenarios_job,
+    'ensemble': run_ensemble_job
+}
@@ -7,13 +7,17 @@ from scipy.integrate import odeint
 import joblib
 from datetime import datetime
 import json
+import sys
 import os
+from atlas import build_scenario_atlas
 
 class EnergyTransitionModel:
     def __init__(self):
         self.scenarios = {}
         self.historical_data = None
         self.model_params = {}
+        self.country_data = None
+        self.country_cube = None
         
     def load_historical_data(self):
         """Load dan preprocess data aktual dari dataset"""
@@ -252,7 +256,17 @@ class EnergyTransitionModel:
         }
         return self.scenarios
     
-    def run_simulation(self, scenario_name, initial_conditions, end_year=2040):
+    def get_initial_conditions(self):
+        """Initial conditions simulasi dari data historis terakhir"""
+        last_data = self.historical_data.iloc[-1]
+        return {
+            'renewable_capacity': float(last_data['renewable_capacity']),
+            'investment': 2.9,
+            'infrastructure': 50.0,
+            'total_capacity': float(last_data.get('total_capacity', 95400))
+        }
+
+    def run_simulation(self, scenario_name, initial_conditions, end_year=2040, param_overrides=None):
         """Menjalankan simulasi untuk skenario tertentu"""
         if not self.scenarios:
             self.create_scenarios()
@@ -260,7 +274,8 @@ class EnergyTransitionModel:
         if scenario_name not in self.scenarios:
             raise ValueError(f"Skenario {scenario_name} tidak ditemukan")
             
-        params = self.scenarios[scenario_name]
+        # Parameter skenario dapat diubah sebagian (misalnya untuk ensemble)
+        params = {**self.scenarios[scenario_name], **(param_overrides or {})}
         years = np.arange(2023, end_year + 1)
         t = np.arange(0, len(years))
         
@@ -310,6 +325,158 @@ class EnergyTransitionModel:
             
         return pd.concat(all_results, ignore_index=True)
     
+    def load_country_data(self):
+        """Initial conditions dan laju pertumbuhan kapasitas per negara dari dataset"""
+        df = pd.read_csv('dataset/Renewable_Energy.csv')
+        year_cols = [f'F{year}' for year in range(2000, 2024)]
+        
+        capacity = df[df['Indicator'] == 'Electricity Installed Capacity']
+        total_cap = capacity.groupby('Country')[year_cols].sum(min_count=1)
+        renewable_cap = (
+            capacity[capacity['Energy_Type'] == 'Total Renewable']
+            .groupby('Country')[year_cols].sum(min_count=1)
+            .reindex(total_cap.index)
+        )
+        
+        total_values = total_cap.to_numpy(dtype=float)
+        renewable_values = renewable_cap.to_numpy(dtype=float)
+        valid = np.isfinite(total_values) & (total_values > 0)
+        
+        # Tahun terakhir dengan data kapasitas total per negara
+        last_idx = len(year_cols) - 1 - np.argmax(valid[:, ::-1], axis=1)
+        rows = np.arange(len(total_cap))
+        base_total = np.where(valid.any(axis=1), total_values[rows, last_idx], np.nan)
+        base_renewable = np.nan_to_num(renewable_values[rows, last_idx])
+        
+        # Fit log-linear kapasitas total untuk 10 tahun terakhir
+        years = np.arange(2000, 2024, dtype=float)
+        fit_mask = valid & (years >= 2014)
+        log_total = np.log(np.where(fit_mask, total_values, 1.0))
+        n = fit_mask.sum(axis=1)
+        x_mean = (fit_mask * years).sum(axis=1) / np.maximum(n, 1)
+        y_mean = (fit_mask * log_total).sum(axis=1) / np.maximum(n, 1)
+        dx = np.where(fit_mask, years - x_mean[:, None], 0.0)
+        dy = np.where(fit_mask, log_total - y_mean[:, None], 0.0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            growth = (dx * dy).sum(axis=1) / (dx * dx).sum(axis=1)
+        
+        # Asumsi 5% per tahun jika data tidak cukup, batasi outlier
+        growth = np.where((n >= 3) & np.isfinite(growth), growth, 0.05)
+        growth = np.clip(growth, -0.05, 0.15)
+        
+        # Tingkat investasi awal dari laju penambahan kapasitas terbarukan
+        # 5 tahun terakhir (relatif terhadap sistem), dikalibrasi sehingga
+        # Indonesia mendapat nilai 2.9 seperti pada simulasi nasional
+        past_idx = np.maximum(last_idx - 5, 0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            build_rate = (
+                (renewable_values[rows, last_idx] - renewable_values[rows, past_idx]) /
+                np.maximum(last_idx - past_idx, 1) / base_total
+            )
+        countries = total_cap.index.tolist()
+        reference_rate = build_rate[countries.index('Indonesia')] if 'Indonesia' in countries else np.nan
+        if not (np.isfinite(reference_rate) and reference_rate > 0):
+            reference_rate = np.nanmedian(build_rate[build_rate > 0])
+        relative_rate = np.where(np.isfinite(build_rate), build_rate / reference_rate, 1.0)
+        investment = 2.9 * np.clip(relative_rate, 0.1, 10.0)
+        
+        self.country_data = pd.DataFrame({
+            'renewable_capacity': base_renewable,
+            'total_capacity': base_total,
+            'base_year': 2000 + last_idx,
+            'capacity_growth': growth,
+            'investment': investment,
+            # Dataset tidak memuat indikator infrastruktur, pakai nilai nasional
+            'infrastructure': 50.0
+        }, index=total_cap.index)
+        
+        print(f"Data {len(self.country_data)} negara berhasil dimuat")
+        return self.country_data
+    
+    def run_country_batch(self, end_year=2050):
+        """Menjalankan semua negara x skenario dalam satu integrasi ODE"""
+        if not self.scenarios:
+            self.create_scenarios()
+        if self.country_data is None:
+            self.load_country_data()
+        
+        countries = self.country_data.index.tolist()
+        scenario_names = list(self.scenarios.keys())
+        years = np.arange(2023, end_year + 1)
+        
+        # Negara tanpa data kapasitas tidak disimulasikan (hasil NaN)
+        data = self.country_data
+        valid = (data['total_capacity'] > 0).to_numpy()
+        n_valid, n_scen = int(valid.sum()), len(scenario_names)
+        size = n_valid * n_scen
+        
+        # Integrasi dimulai dari tahun dasar paling awal; tiap negara baru
+        # bergerak setelah tahun dasarnya sendiri (offset dalam tahun)
+        base_year = data['base_year'].to_numpy()[valid]
+        start_year = int(base_year.min())
+        t = np.arange(0, end_year - start_year + 1)
+        offset = np.repeat(base_year - start_year, n_scen)
+        
+        # Kapasitas dinormalisasi ke skala sistem Indonesia (95400 MW)
+        # agar parameter skenario berlaku untuk semua ukuran negara
+        total0 = data['total_capacity'].to_numpy()[valid]
+        scale = total0 / 95400
+        renewable0 = data['renewable_capacity'].to_numpy()[valid] / scale
+        growth = np.repeat(data['capacity_growth'].to_numpy()[valid], n_scen)
+        
+        # Parameter skenario sebagai array (negara x skenario), diratakan
+        param_keys = ['investment_growth', 'tech_improvement', 'infrastructure_coeff',
+                      'depreciation', 'policy_effectiveness']
+        params = {
+            key: np.tile([self.scenarios[s][key] for s in scenario_names], n_valid)
+            for key in param_keys
+        }
+        
+        # Batas kapasitas terbarukan mengikuti kapasitas total negara. Porsi
+        # maksimum skenario dinaikkan ke porsi awal negara agar negara yang
+        # sudah melampauinya tidak langsung turun paksa.
+        max_share = np.maximum(
+            np.tile([self.scenarios[s]['max_capacity'] / 95400 for s in scenario_names], n_valid),
+            np.repeat(renewable0 / 95400, n_scen)
+        )
+        
+        # State disusun per (negara, skenario): [R, I, F, R, I, F, ...]
+        # sehingga Jacobian berbentuk band dengan lebar 2
+        state0 = np.column_stack([
+            np.repeat(renewable0, n_scen),
+            np.repeat(data['investment'].to_numpy()[valid], n_scen),
+            np.repeat(data['infrastructure'].to_numpy()[valid], n_scen)
+        ]).ravel()
+        
+        def batched_model(state, t):
+            elapsed = np.maximum(t - offset, 0)
+            step_params = {**params, 'max_capacity': max_share * 95400 * np.exp(growth * elapsed)}
+            derivatives = self.energy_transition_model(state.reshape(size, 3).T, t, step_params)
+            started = t >= offset
+            return np.column_stack([d * started for d in derivatives]).ravel()
+        
+        solution = odeint(batched_model, state0, t, ml=2, mu=2)
+        solution = solution.reshape(len(t), n_valid, n_scen, 3).transpose(1, 2, 0, 3)
+        solution = solution[:, :, years[0] - start_year:]
+        
+        elapsed = np.maximum(years[None, :] - base_year[:, None], 0)
+        total_capacity = total0[:, None] * np.exp(data['capacity_growth'].to_numpy()[valid][:, None] * elapsed)
+        
+        # Kapasitas terbarukan tidak boleh melebihi kapasitas total
+        renewable_capacity = np.minimum(solution[..., 0] * scale[:, None, None],
+                                        total_capacity[:, None, :])
+        
+        values = np.full((len(countries), n_scen, len(years), len(CountryCube.VARIABLES)),
+                         np.nan, dtype=np.float32)
+        values[valid, ..., 0] = renewable_capacity
+        values[valid, ..., 1] = solution[..., 1]
+        values[valid, ..., 2] = solution[..., 2]
+        values[valid, ..., 3] = total_capacity[:, None, :]
+        values[valid, ..., 4] = renewable_capacity / total_capacity[:, None, :] * 100
+        
+        self.country_cube = CountryCube(countries, scenario_names, years, values, self.scenarios)
+        return self.country_cube
+    
     def get_asean_comparison(self):
         """Membuat data perbandingan ASEAN"""
         try:
@@ -397,6 +564,56 @@ class EnergyTransitionModel:
             self.create_scenarios()
         return self
 
+class CountryCube:
+    """Hasil simulasi multi-negara: array negara x skenario x tahun x variabel"""
+    VARIABLES = ['renewable_capacity', 'investment', 'infrastructure',
+                 'total_capacity', 'renewable_share']
+    
+    def __init__(self, countries, scenarios, years, values, scenario_params=None):
+        self.countries = list(countries)
+        self.scenarios = list(scenarios)
+        self.years = np.asarray(years)
+        self.values = values
+        # Parameter skenario saat cube dihitung, untuk menolak cube usang
+        self.scenario_params = scenario_params
+        self._country_idx = {c: i for i, c in enumerate(self.countries)}
+        self._scenario_idx = {s: i for i, s in enumerate(self.scenarios)}
+    
+    def query(self, country, scenario_name, end_year=None):
+        """Mengambil satu trajektori dalam format yang sama dengan run_simulation"""
+        if country not in self._country_idx:
+            raise ValueError(f"Negara {country} tidak ditemukan")
+        if scenario_name not in self._scenario_idx:
+            raise ValueError(f"Skenario {scenario_name} tidak ditemukan")
+        
+        year_mask = self.years <= (end_year if end_year is not None else self.years[-1])
+        values = self.values[self._country_idx[country], self._scenario_idx[scenario_name], year_mask]
+        
+        results = pd.DataFrame(values.astype(float), columns=self.VARIABLES)
+        results.insert(0, 'year', self.years[year_mask])
+        results['scenario'] = scenario_name
+        return results
+    
+    def save(self, filename='models/country_cube.npz'):
+        """Menyimpan cube ke file"""
+        np.savez_compressed(filename, values=self.values, years=self.years,
+                            countries=np.array(self.countries), scenarios=np.array(self.scenarios),
+                            scenario_params=np.array(json.dumps(self.scenario_params)))
+        print(f"Cube negara disimpan sebagai {filename}")
+    
+    @classmethod
+    def load(cls, filename='models/country_cube.npz', scenarios=None):
+        """Memuat cube dari file; ValueError jika dihitung dengan skenario lain"""
+        data = np.load(filename)
+        scenario_params = json.loads(str(data['scenario_params'])) if 'scenario_params' in data else None
+        
+        # Dibandingkan lewat JSON seperti atlas agar tipe hasil serialisasi sama
+        if scenarios is not None and scenario_params != json.loads(json.dumps(scenarios)):
+            raise ValueError(f"Cube {filename} dihitung dengan skenario yang berbeda")
+        
+        return cls(data['countries'].tolist(), data['scenarios'].tolist(), data['years'],
+                   data['values'], scenario_params)
+
 # Fungsi untuk membuat dan menyimpan model
 def create_and_save_model():
     """Membuat dan menyimpan model"""
@@ -408,6 +625,12 @@ def create_and_save_model():
     os.makedirs('models', exist_ok=True)
     model.save_model('models/energy_model.joblib')
     
+    # Hitung semua respons /simulate dan /compare ke dalam atlas
+    build_scenario_atlas(model, 'models/scenario_atlas')
+    
+    # Simulasi semua negara x skenario sampai 2050
+    model.run_country_batch(2050).save('models/country_cube.npz')
+    
     # Simpan metadata
     metadata = {
         'created_at': datetime.now().isoformat(),
@@ -422,9 +645,14 @@ def create_and_save_model():
     return model
 
 if __name__ == "__main__":
-    # Buat dan simpan model
-    model = create_and_save_model()
-    print("Model berhasil dibuat dan disimpan!")
+    if '--cube' in sys.argv:
+        # Bangun cube negara dari model tersimpan tanpa mengubah file model
+        model = EnergyTransitionModel().load_model('models/energy_model.joblib')
+        model.run_country_batch(2050).save('models/country_cube.npz')
+    else:
+        # Buat dan simpan model
+        model = create_and_save_model()
+        print("Model berhasil dibuat dan disimpan!")
     
     # Tampilkan data historis
     print("\nData Historis Indonesia:")
@@ -0,0 +1,221 @@
+"""Fungsi pembuatan grafik hasil simulasi (dipakai oleh app dan build atlas)
+
+Setiap jenis grafik memakai template Figure yang dibuat sekali per thread
+dengan API object-oriented Agg (tanpa pyplot). Per request hanya data
+garis, batas sumbu dan judul yang diperbarui sebelum dirender ke buffer
+yang sama.
+"""
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+import threading
+import io
+import base64
+
+# Template per thread karena Figure tidak thread-safe
+_templates = threading.local()
+
+def _fix_layout(fig):
+    """Menghitung layout sekali lalu melepas layout engine
+
+    tight_layout meninggalkan placeholder engine yang membuat savefig
+    menggambar figure dua kali.
+    """
+    fig.tight_layout()
+    fig.set_layout_engine(None)
+
+def _render(template):
+    """Render template ke PNG base64 memakai buffer yang dipakai ulang"""
+    buf = template['buffer']
+    buf.seek(0)
+    buf.truncate()
+    template['figure'].savefig(buf, format='png', dpi=100)
+    return base64.b64encode(buf.getvalue()).decode('utf8')
+
+def _rescale(*axes):
+    for ax in axes:
+        ax.relim()
+        ax.autoscale_view()
+
+def _simulation_template():
+    """Membuat template plot hasil simulasi (2x2)"""
+    fig = Figure(figsize=(12, 8))
+    FigureCanvasAgg(fig)
+    (ax1, ax2), (ax3, ax4) = fig.subplots(2, 2)
+
+    # Plot 1: Pangsa Energi Terbarukan
+    share_hist, = ax1.plot([], [], 'bo-', label='Data Historis', linewidth=2)
+    share_proj, = ax1.plot([], [], 'r-', label='Proyeksi', linewidth=2)
+    ax1.axhline(y=23, color='g', linestyle='--', label='Target 23%')
+    ax1.set_xlabel('Tahun')
+    ax1.set_ylabel('Pangsa Energi Terbarukan (%)')
+    ax1.legend()
+    ax1.grid(True, alpha=0.3)
+
+    # Plot 2: Kapasitas Terpasang
+    cap_hist, = ax2.plot([], [], 'bo-', label='Data Historis', linewidth=2)
+    cap_proj, = ax2.plot([], [], 'r-', label='Proyeksi', linewidth=2)
+    ax2.set_xlabel('Tahun')
+    ax2.set_ylabel('Kapasitas Terbarukan (MW)')
+    ax2.legend()
+    ax2.grid(True, alpha=0.3)
+
+    # Plot 3: Investasi
+    investment, = ax3.plot([], [], 'g-', linewidth=2)
+    ax3.set_xlabel('Tahun')
+    ax3.set_ylabel('Tingkat Investasi')
+    ax3.grid(True, alpha=0.3)
+
+    # Plot 4: Infrastruktur
+    infrastructure, = ax4.plot([], [], 'm-', linewidth=2)
+    ax4.set_xlabel('Tahun')
+    ax4.set_ylabel('Tingkat Infrastruktur')
+    ax4.grid(True, alpha=0.3)
+
+    # Layout dihitung sekali dengan judul contoh
+    for ax in (ax1, ax2, ax3, ax4):
+        ax.set_title('Perkembangan Infrastruktur - Kombinasi Kebijakan')
+    _fix_layout(fig)
+
+    return {
+        'figure': fig,
+        'axes': (ax1, ax2, ax3, ax4),
+        'lines': (share_hist, share_proj, cap_hist, cap_proj, investment, infrastructure),
+        'buffer': io.BytesIO()
+    }
+
+def _comparison_template(scenarios):
+    """Membuat template plot perbandingan untuk daftar skenario tertentu"""
+    fig = Figure(figsize=(12, 6))
+    FigureCanvasAgg(fig)
+    ax = fig.subplots()
+
+    # Plot data historis
+    hist, = ax.plot([], [], 'ko-', label='Data Historis', linewidth=2)
+
+    # Satu garis per skenario
+    scenario_lines = {}
+    for scenario_name, scenario_info in scenarios.items():
+        scenario_lines[scenario_name], = ax.plot([], [], label=scenario_info['name'],
+                                                 color=scenario_info['color'], linewidth=2)
+
+    ax.axhline(y=23, color='red', linestyle='--', label='Target 23%', linewidth=2)
+    ax.set_xlabel('Tahun')
+    ax.set_ylabel('Pangsa Energi Terbarukan (%)')
+    ax.set_title('Perbandingan Semua Skenario Kebijakan')
+    ax.legend()
+    ax.grid(True, alpha=0.3)
+    _fix_layout(fig)
+
+    return {
+        'figure': fig,
+        'axes': ax,
+        'lines': (hist, scenario_lines),
+        'key': [(name, info['name'], info['color']) for name, info in scenarios.items()],
+        'buffer': io.BytesIO()
+    }
+
+def _asean_template(countries):
+    """Membuat template plot ASEAN untuk daftar negara tertentu"""
+    fig = Figure(figsize=(10, 6))
+    FigureCanvasAgg(fig)
+    ax = fig.subplots()
+
+    # Warna berbeda untuk Indonesia
+    colors = ['#ff6b6b' if country == 'Indonesia' else '#4ecdc4' for country in countries]
+
+    bars = ax.bar(countries, [0] * len(countries), color=colors, alpha=0.7)
+
+    # Label nilai di atas bar, posisinya diperbarui per request
+    labels = [ax.text(bar.get_x() + bar.get_width()/2., 0, '',
+                      ha='center', va='bottom', fontweight='bold') for bar in bars]
+
+    ax.axhline(y=23, color='red', linestyle='--', label='Target Indonesia 23%')
+    ax.set_ylabel('Pangsa Energi Terbarukan (%)')
+    ax.set_title('Perbandingan Pangsa Energi Terbarukan ASEAN')
+    ax.legend()
+    ax.grid(True, alpha=0.3, axis='y')
+    _fix_layout(fig)
+
+    return {
+        'figure': fig,
+        'axes': ax,
+        'bars': bars,
+        'labels': labels,
+        'key': list(countries),
+        'buffer': io.BytesIO()
+    }
+
+def create_plot(results, scenario_name, historical_data):
+    """Membuat plot hasil simulasi"""
+    try:
+        template = getattr(_templates, 'simulation', None)
+        if template is None:
+            template = _templates.simulation = _simulation_template()
+
+        ax1, ax2, ax3, ax4 = template['axes']
+        share_hist, share_proj, cap_hist, cap_proj, investment, infrastructure = template['lines']
+
+        share_hist.set_data(historical_data['year'], historical_data['renewable_share'])
+        share_proj.set_data(results['year'], results['renewable_share'])
+        cap_hist.set_data(historical_data['year'], historical_data['renewable_capacity'])
+        cap_proj.set_data(results['year'], results['renewable_capacity'])
+        investment.set_data(results['year'], results['investment'])
+        infrastructure.set_data(results['year'], results['infrastructure'])
+
+        ax1.set_title(f'Pangsa Energi Terbarukan - {scenario_name}')
+        ax2.set_title(f'Kapasitas Energi Terbarukan - {scenario_name}')
+        ax3.set_title(f'Tingkat Investasi - {scenario_name}')
+        ax4.set_title(f'Perkembangan Infrastruktur - {scenario_name}')
+        _rescale(ax1, ax2, ax3, ax4)
+
+        return _render(template)
+    except Exception as e:
+        print(f"Error creating plot: {e}")
+        return None
+
+def create_comparison_plot(historical_data, all_results, scenarios):
+    """Membuat plot perbandingan semua skenario"""
+    try:
+        # Template dibuat ulang hanya jika daftar skenario berubah
+        template = getattr(_templates, 'comparison', None)
+        key = [(name, info['name'], info['color']) for name, info in scenarios.items()]
+        if template is None or template['key'] != key:
+            template = _templates.comparison = _comparison_template(scenarios)
+
+        hist, scenario_lines = template['lines']
+        hist.set_data(historical_data['year'], historical_data['renewable_share'])
+
+        for scenario_name, line in scenario_lines.items():
+            scenario_data = all_results[all_results['scenario'] == scenario_name]
+            line.set_data(scenario_data['year'], scenario_data['renewable_share'])
+
+        _rescale(template['axes'])
+
+        return _render(template)
+    except Exception as e:
+        print(f"Error creating comparison plot: {e}")
+        return None
+
+def create_asean_plot(asean_comparison):
+    """Membuat plot perbandingan ASEAN"""
+    try:
+        countries = list(asean_comparison.keys())
+        shares = list(asean_comparison.values())
+
+        # Template dibuat ulang hanya jika daftar negara berubah
+        template = getattr(_templates, 'asean', None)
+        if template is None or template['key'] != countries:
+            template = _templates.asean = _asean_template(countries)
+
+        # Perbarui tinggi bar dan nilai di atasnya
+        for bar, label, share in zip(template['bars'], template['labels'], shares):
+            bar.set_height(share)
+            label.set_y(share + 0.5)
+            label.set_text(f'{share:.1f}%')
+
+        template['axes'].set_ylim(0, max(shares + [23]) * 1.1)
+
+        return _render(template)
+    except Exception as e:
+        print(f"Error creating ASEAN plot: {e}")
+        return None
@@ -0,0 +1,78 @@
+import json
+import numpy as np
+import pytest
+import atlas
+from atlas import ScenarioAtlas, build_scenario_atlas, simulation_payload, comparison_payload
+from model_energi import EnergyTransitionModel
+
+END_YEAR = 2030
+
+@pytest.fixture(scope='module')
+def model():
+    model = EnergyTransitionModel()
+    model.load_historical_data()
+    model.create_scenarios()
+    return model
+
+@pytest.fixture(scope='module')
+def atlas_path(model, tmp_path_factory):
+    # Atlas kecil dengan satu tahun akhir agar test tetap cepat
+    path = str(tmp_path_factory.mktemp('atlas') / 'scenario_atlas')
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(atlas, 'ATLAS_START_YEAR', END_YEAR)
+        mp.setattr(atlas, 'ATLAS_END_YEAR', END_YEAR)
+        build_scenario_atlas(model, path)
+    return path
+
+def payload_bytes(payload):
+    return json.dumps(payload).encode('utf8')
+
+def test_atlas_matches_live_payloads(model, atlas_path):
+    loaded = ScenarioAtlas().load(model, atlas_path)
+    initial_conditions = model.get_initial_conditions()
+
+    for scenario_name in model.scenarios:
+        live = simulation_payload(model, scenario_name, END_YEAR, initial_conditions)
+        assert loaded.get_simulation(scenario_name, END_YEAR) == payload_bytes(live)
+
+    live = comparison_payload(model, END_YEAR, initial_conditions)
+    assert loaded.get_comparison(END_YEAR) == payload_bytes(live)
+    # Di luar rentang atlas kembali ke komputasi langsung
+    assert loaded.get_comparison(END_YEAR + 1) is None
+
+def rewrite_index(path, **changes):
+    with open(f'{path}.json') as f:
+        index = json.load(f)
+    index.update(changes)
+    with open(f'{path}.json', 'w') as f:
+        json.dump(index, f)
+
+@pytest.mark.parametrize('field', ['code_hash', 'historical_hash', 'blob_hash'])
+def test_mismatched_index_falls_back(model, atlas_path, tmp_path, field):
+    path = str(tmp_path / 'scenario_atlas')
+    for suffix in ('.npy', '.json'):
+        with open(atlas_path + suffix, 'rb') as src, open(path + suffix, 'wb') as dst:
+            dst.write(src.read())
+    rewrite_index(path, **{field: 'stale'})
+
+    loaded = ScenarioAtlas().load(model, path)
+    assert loaded.entries == {}
+    assert loaded.get_simulation('business_as_usual', END_YEAR) is None
+
+def test_changed_historical_data_falls_back(model, atlas_path):
+    changed = EnergyTransitionModel()
+    changed.load_historical_data()
+    changed.create_scenarios()
+    changed.historical_data.loc[0, 'renewable_share'] += 1
+
+    assert ScenarioAtlas().load(changed, atlas_path).entries == {}
+
+def test_blob_from_other_build_falls_back(model, atlas_path, tmp_path):
+    # Simulasi rebuild yang terputus: blob baru, indeks lama
+    path = str(tmp_path / 'scenario_atlas')
+    with open(atlas_path + '.json', 'rb') as src, open(path + '.json', 'wb') as dst:
+        dst.write(src.read())
+    blob = np.load(atlas_path + '.npy')
+    np.save(path + '.npy', blob[:-1])
+
+    assert ScenarioAtlas().load(model, path).entries == {}
@@ -0,0 +1,32 @@
+import pytest
+import app as energy_app
+
+@pytest.fixture
+def client():
+    return energy_app.app.test_client()
+
+def test_invalid_operation_fails_only_its_entry(client):
+    response = client.post('/batch', json={'operations': [
+        {'op': 'data'},
+        {'op': 'simulate', 'scenario': ['x'], 'end_year': 2040},
+        {'op': 'simulate', 'scenario': {'a': 1}},
+        {'op': 'compare', 'end_year': 1990},
+        {'op': 'unknown'},
+        'not an object'
+    ]})
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data['success'] is True
+    results = data['results']
+    assert results[0]['success'] is True
+    assert [result['success'] for result in results[1:]] == [False] * 5
+    assert results[1]['error'] == 'Skenario harus berupa string'
+
+def test_duplicate_operations_share_one_result(client):
+    data = client.post('/batch', json={'operations': [{'op': 'data'}, {'op': 'data'}]}).get_json()
+    assert data['results'][0] == data['results'][1]
+
+def test_missing_operations(client):
+    for body in ({}, {'operations': []}, [1]):
+        data = client.post('/batch', json=body).get_json()
+        assert data['success'] is False
@@ -0,0 +1,149 @@
+import threading
+import time
+import pytest
+import jobs
+from jobs import JobManager, JobLimitError
+
+def wait_for(predicate, timeout=5):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+def blocking_runner(release):
+    """Runner yang berjalan sampai `release` di-set atau job dibatalkan"""
+    def run(model, job, params):
+        while not release.is_set():
+            job.check_cancelled()
+            time.sleep(0.01)
+        return {'ok': True}
+    return run
+
+def event_names(job):
+    return [event for event, _ in job.events]
+
+def test_queue_full_raises():
+    # Tanpa worker, job tetap di antrean
+    manager = JobManager(None, {'block': blocking_runner(threading.Event())},
+                         max_queued=2, max_per_client=10, workers=0)
+    manager.submit('a', 'block', {})
+    manager.submit('b', 'block', {})
+    with pytest.raises(JobLimitError):
+        manager.submit('c', 'block', {})
+
+def test_per_client_limit():
+    manager = JobManager(None, {'block': blocking_runner(threading.Event())},
+                         max_queued=10, max_per_client=2, workers=0)
+    manager.submit('a', 'block', {})
+    manager.submit('a', 'block', {})
+    with pytest.raises(JobLimitError):
+        manager.submit('a', 'block', {})
+    # Client lain tidak terpengaruh
+    manager.submit('b', 'block', {})
+
+def test_per_client_limit_frees_after_cancel():
+    manager = JobManager(None, {'block': blocking_runner(threading.Event())},
+                         max_queued=10, max_per_client=1, workers=0)
+    job = manager.submit('a', 'block', {})
+    manager.cancel(job.id)
+    manager.submit('a', 'block', {})
+
+def test_cancel_frees_queue_capacity():
+    release = threading.Event()
+    manager = JobManager(None, {'block': blocking_runner(release)},
+                         max_queued=2, max_per_client=10, workers=1)
+    running = manager.submit('a', 'block', {})
+    assert wait_for(lambda: running.status == 'running')
+
+    first = manager.submit('b', 'block', {})
+    second = manager.submit('c', 'block', {})
+    with pytest.raises(JobLimitError):
+        manager.submit('d', 'block', {})
+
+    # Job yang dibatalkan tidak lagi memakan tempat di antrean
+    manager.cancel(first.id)
+    manager.cancel(second.id)
+    manager.submit('d', 'block', {})
+    manager.submit('e', 'block', {})
+    with pytest.raises(JobLimitError):
+        manager.submit('f', 'block', {})
+    release.set()
+
+def test_queued_is_first_event():
+    manager = JobManager(None, {'quick': lambda model, job, params: {'ok': True}},
+                         max_queued=10, max_per_client=10, workers=1)
+    for _ in range(20):
+        job = manager.submit('a', 'quick', {})
+        assert wait_for(lambda: job.finished)
+        assert event_names(job) == ['queued', 'done']
+
+def test_unknown_job_type():
+    manager = JobManager(None, {}, workers=0)
+    with pytest.raises(ValueError):
+        manager.submit('a', 'missing', {})
+
+def test_cancel_while_queued():
+    release = threading.Event()
+    manager = JobManager(None, {'block': blocking_runner(release)},
+                         max_queued=10, max_per_client=10, workers=1)
+    running = manager.submit('a', 'block', {})
+    assert wait_for(lambda: running.status == 'running')
+
+    queued = manager.submit('a', 'block', {})
+    manager.cancel(queued.id)
+    assert queued.status == 'cancelled'
+    assert event_names(queued) == ['queued', 'cancelled']
+
+    # Worker melewati job yang sudah dibatalkan
+    release.set()
+    assert wait_for(lambda: running.status == 'done')
+    time.sleep(0.05)
+    assert event_names(queued) == ['queued', 'cancelled']
+
+def test_cancel_while_running():
+    manager = JobManager(None, {'block': blocking_runner(threading.Event())},
+                         max_queued=10, max_per_client=10, workers=1)
+    job = manager.submit('a', 'block', {})
+    assert wait_for(lambda: job.status == 'running')
+
+    manager.cancel(job.id)
+    assert wait_for(lambda: job.status == 'cancelled')
+    assert event_names(job)[-1] == 'cancelled'
+
+def test_stream_limits_and_release(monkeypatch):
+    monkeypatch.setattr(jobs, 'MAX_OPEN_STREAMS', 2)
+    monkeypatch.setattr(jobs, 'MAX_STREAMS_PER_CLIENT', 2)
+    monkeypatch.setattr(jobs, 'MAX_STREAMS_PER_JOB', 1)
+    manager = JobManager(None, {'block': blocking_runner(threading.Event())},
+                         max_queued=10, max_per_client=10, workers=0)
+    first = manager.submit('a', 'block', {})
+    second = manager.submit('a', 'block', {})
+    third = manager.submit('b', 'block', {})
+
+    stream = manager.open_stream(first.id, 'a')
+    with pytest.raises(JobLimitError):
+        manager.open_stream(first.id, 'a')  # per job
+    manager.open_stream(second.id, 'a')
+    with pytest.raises(JobLimitError):
+        manager.open_stream(third.id, 'b')  # total
+
+    stream.close()
+    manager.open_stream(third.id, 'b')
+    assert manager.open_stream('missing', 'a') is None
+
+def test_stream_ends_on_terminal_event():
+    manager = JobManager(None, {'block': blocking_runner(threading.Event())},
+                         max_queued=10, max_per_client=10, workers=0)
+    job = manager.submit('a', 'block', {})
+    manager.cancel(job.id)
+
+    stream = manager.open_stream(job.id, 'a')
+    messages = list(stream)
+    # Slot dilepas begitu stream habis, tanpa menunggu close()
+    assert manager._open_streams == 0
+    stream.close()
+    assert manager._open_streams == 0
+    assert messages[0].startswith('event: queued')
+    assert messages[-1].startswith('event: cancelled')